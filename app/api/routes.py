@@ -1,40 +1,56 @@
+import asyncio
 import logging
-from typing import List
-
-from fastapi import APIRouter, HTTPException, Depends, Query
+import os
+from concurrent.futures import Executor
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, or_, select, text
 from sqlalchemy.orm import Session
 
-from ..database import get_db, Analysis
-from ..schemas import AnalyzeRequest, AnalysisResponse, SearchResponse
-from ..services import LLMService, TextProcessor
+from ..database import get_db, get_db_ro, Analysis, lowercase_search_values, search_index_enabled
+from ..schemas import AnalyzeRequest, AnalysisResponse, AnalysisPage, SearchResponse
+from ..services import LLMService, TextProcessor, get_text_processor
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize services lazily to ensure environment is loaded
-_llm_service = None
-_text_processor = None
+# Maximum number of concurrent LLM calls issued by /analyze/batch
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+
+
+def get_llm_service(request: Request) -> LLMService:
+    """Return the LLM service created at startup (see app.main.lifespan)."""
+    llm_service = request.app.state.llm_service
+    if llm_service is None:
+        # Service could not be configured, e.g. OPENAI_API_KEY is missing
+        raise HTTPException(status_code=400, detail=request.app.state.llm_service_error)
+    return llm_service
 
 
-def get_llm_service():
-    global _llm_service
-    if _llm_service is None:
-        _llm_service = LLMService()
-    return _llm_service
+def get_cpu_pool(request: Request) -> Optional[Executor]:
+    """Return the process pool for POS-tagged text processing (None when text is processed inline)."""
+    return request.app.state.cpu_pool
 
 
-def get_text_processor():
-    global _text_processor
-    if _text_processor is None:
-        _text_processor = TextProcessor()
-    return _text_processor
+async def _run_text_processing(cpu_pool: Optional[Executor], func, *args):
+    """Run a TextProcessor call in the process pool if there is one, otherwise inline."""
+    if cpu_pool is None:
+        # The default regex path takes microseconds; a pool round-trip would cost more than the work
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(cpu_pool, func, *args)
 
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_text(
         request: AnalyzeRequest,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        llm_service: LLMService = Depends(get_llm_service),
+        text_processor: TextProcessor = Depends(get_text_processor),
+        cpu_pool: Optional[Executor] = Depends(get_cpu_pool)
 ):
     """
     Analyze text to generate summary and extract metadata.
@@ -44,50 +60,32 @@ async def analyze_text(
     - LLM API failure (returns error message)
     """
     try:
-        # Get service instances
-        text_processor = get_text_processor()
-        llm_service = get_llm_service()
-
-        # Extract keywords using local processing
-        keywords = text_processor.extract_keywords(request.text)
-
-        # Get LLM analysis
-        try:
-            llm_result = llm_service.analyze_text(request.text)
-        except Exception as e:
-            # Handle LLM API failure
-            logger.error(f"LLM analysis failed: {str(e)}")
-            # Provide fallback values
-            llm_result = {
-                "summary": "Analysis failed due to LLM error. Text stored for later processing.",
-                "title": None,
-                "topics": ["error", "processing", "failed"],
-                "sentiment": "neutral"
-            }
+        # Extract keywords using local processing while the LLM call is in flight
+        keywords, llm_result = await asyncio.gather(
+            _run_text_processing(cpu_pool, text_processor.extract_keywords, request.text),
+            _analyze_with_fallback(llm_service, request.text)
+        )
 
         # Calculate confidence score
-        confidence_score = text_processor.calculate_confidence_score(
+        confidence_score = await _run_text_processing(
+            cpu_pool,
+            text_processor.calculate_confidence_score,
             request.text,
             llm_result["summary"],
             llm_result["topics"]
         )
 
         # Create database entry
-        analysis = Analysis(
-            original_text=request.text,
-            summary=llm_result["summary"],
-            title=llm_result["title"],
-            topics=llm_result["topics"],
-            sentiment=llm_result["sentiment"],
-            keywords=keywords if keywords else ["none", "found", "extracted"],
-            confidence_score=confidence_score
-        )
+        analysis = Analysis(**_build_analysis(request.text, keywords, llm_result, confidence_score))
 
         db.add(analysis)
+        # Flushing fills in analysis.id from the INSERT; building the response
+        # before commit avoids reloading the expired row with a second SELECT
+        db.flush()
+        response = AnalysisResponse.model_validate(analysis)
         db.commit()
-        db.refresh(analysis)
 
-        return AnalysisResponse.model_validate(analysis)
+        return response
 
     except ValueError as e:
         # Handle validation errors (e.g., empty input)
@@ -98,10 +96,104 @@ async def analyze_text(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/analyze/batch", response_model=List[AnalysisResponse])
+async def analyze_batch(
+        requests: List[AnalyzeRequest],
+        db: Session = Depends(get_db),
+        llm_service: LLMService = Depends(get_llm_service),
+        text_processor: TextProcessor = Depends(get_text_processor),
+        cpu_pool: Optional[Executor] = Depends(get_cpu_pool)
+):
+    """
+    Analyze several texts in one request.
+
+    LLM calls run concurrently, at most LLM_CONCURRENCY at a time. Items whose
+    LLM call fails are stored with the same fallback values as /analyze.
+    """
+    try:
+        semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+        async def analyze_one(text: str) -> Dict:
+            async with semaphore:
+                return await _analyze_with_fallback(llm_service, text)
+
+        texts = [r.text for r in requests]
+
+        # Keyword extraction runs while the LLM calls are in flight
+        keywords_list, llm_results = await asyncio.gather(
+            asyncio.gather(*(_run_text_processing(cpu_pool, text_processor.extract_keywords, t) for t in texts)),
+            asyncio.gather(*(analyze_one(t) for t in texts))
+        )
+
+        confidence_scores = await asyncio.gather(*(
+            _run_text_processing(
+                cpu_pool, text_processor.calculate_confidence_score, text, llm_result["summary"], llm_result["topics"]
+            )
+            for text, llm_result in zip(texts, llm_results)
+        ))
+
+        rows = [
+            _build_analysis(text, keywords, llm_result, confidence_score)
+            for text, keywords, llm_result, confidence_score in zip(texts, keywords_list, llm_results, confidence_scores)
+        ]
+        if not rows:
+            return []
+
+        # One multi-row INSERT that hands back the generated values, in input order;
+        # render_nulls keeps rows with a null title in the same statement
+        statement = insert(Analysis).returning(Analysis.id, Analysis.created_at, sort_by_parameter_order=True)
+        generated = db.execute(statement, rows, execution_options={"render_nulls": True}).all()
+        db.commit()
+
+        return [
+            {**row, "id": analysis_id, "created_at": created_at}
+            for row, (analysis_id, created_at) in zip(rows, generated)
+        ]
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Unexpected error during batch analysis: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+async def _analyze_with_fallback(llm_service: LLMService, text: str) -> Dict:
+    """Run the LLM analysis, substituting fallback values if the LLM API fails."""
+    try:
+        return await llm_service.analyze_text(text)
+    except Exception as e:
+        # Handle LLM API failure
+        logger.error(f"LLM analysis failed: {str(e)}")
+        # Provide fallback values
+        return {
+            "summary": "Analysis failed due to LLM error. Text stored for later processing.",
+            "title": None,
+            "topics": ["error", "processing", "failed"],
+            "sentiment": "neutral"
+        }
+
+
+def _build_analysis(text: str, keywords: List[str], llm_result: Dict, confidence_score: int) -> Dict:
+    """Build the column values of the Analysis row to store."""
+    keywords = keywords if keywords else ["none", "found", "extracted"]
+
+    return {
+        "original_text": text,
+        "summary": llm_result["summary"],
+        "title": llm_result["title"],
+        "topics": llm_result["topics"],
+        "sentiment": llm_result["sentiment"],
+        "keywords": keywords,
+        "confidence_score": confidence_score,
+        **lowercase_search_values(llm_result["summary"], llm_result["title"], llm_result["topics"], keywords)
+    }
+
+
 @router.get("/search", response_model=SearchResponse)
 async def search_analyses(
         topic: str = Query(..., min_length=1, description="Topic or keyword to search for"),
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db_ro)
 ):
     """
     Search stored analyses by topic or keyword.
@@ -113,62 +205,95 @@ async def search_analyses(
     - Summary
     """
     try:
-        # Search in database
-        search_term = topic.lower()
-
-        # Get all analyses (since SQLite JSON search is limited)
-        all_analyses = db.query(Analysis).all()
-
-        # Filter analyses that match the search term
-        matching_analyses = []
-        for analysis in all_analyses:
-            # Check if search term is in topics
-            topics_match = any(search_term in t.lower() for t in analysis.topics)
-
-            # Check if search term is in keywords
-            keywords_match = any(search_term in k.lower() for k in analysis.keywords)
-
-            # Check if search term is in title
-            title_match = analysis.title and search_term in analysis.title.lower()
-
-            # Check if search term is in summary
-            summary_match = search_term in analysis.summary.lower()
-
-            if topics_match or keywords_match or title_match or summary_match:
-                matching_analyses.append(analysis)
-
-        # Convert to response models
-        analyses_response = [AnalysisResponse.model_validate(a) for a in matching_analyses]
-
-        return SearchResponse(
-            analyses=analyses_response,
-            total_count=len(analyses_response),
-            search_term=topic
-        )
+        if search_index_enabled(db.get_bind()) and len(topic) >= 3:
+            matching_analyses = _search_fts(db, topic)
+        else:
+            matching_analyses = _search_like(db, topic)
+
+        # ORM rows are serialized once by the response model, straight to JSON
+        return {
+            "analyses": matching_analyses,
+            "total_count": len(matching_analyses),
+            "search_term": topic
+        }
 
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
-@router.get("/analyses", response_model=List[AnalysisResponse])
+def _search_fts(db: Session, topic: str) -> List[Analysis]:
+    """Substring search through the analyses_fts trigram index (needs 3+ characters)."""
+    # Quote the term as an FTS5 phrase so operators in user input are matched literally
+    phrase = '"' + topic.replace('"', '""') + '"'
+    statement = text(
+        "SELECT a.* FROM analyses a JOIN analyses_fts f ON f.rowid = a.id "
+        "WHERE analyses_fts MATCH :q ORDER BY a.id"
+    )
+    return db.query(Analysis).from_statement(statement).params(q=phrase).all()
+
+
+def _search_like(db: Session, topic: str) -> List[Analysis]:
+    """Fallback search using LIKE filters over the precomputed lowercase columns."""
+    # Escape LIKE wildcards so the term is matched as a plain substring
+    escaped = topic.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"%{escaped}%"
+    columns = [Analysis.title_lc, Analysis.summary_lc, Analysis.topics_lc, Analysis.keywords_lc]
+    return (
+        db.query(Analysis)
+        .filter(or_(*(column.like(pattern, escape="\\") for column in columns)))
+        .order_by(Analysis.id)
+        .all()
+    )
+
+
+@router.get("/analyses", response_model=AnalysisPage)
 async def get_all_analyses(
-        skip: int = 0,
-        limit: int = 100,
-        db: Session = Depends(get_db)
+        cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+        limit: int = Query(100, ge=1),
+        db: Session = Depends(get_db_ro)
 ):
-    """Get all analyses with pagination."""
-    analyses = db.query(Analysis).offset(skip).limit(limit).all()
-    return [AnalysisResponse.model_validate(a) for a in analyses]
+    """
+    Get analyses newest first, one page at a time.
+
+    Uses keyset pagination on the primary key, so every page costs the same
+    regardless of how deep it is. Rows are streamed to the client as they are
+    read instead of building the whole page in memory.
+    """
+    statement = select(Analysis).order_by(Analysis.id.desc()).limit(limit)
+    if cursor is not None:
+        statement = statement.where(Analysis.id < cursor)
+    analyses = db.execute(statement.execution_options(yield_per=100)).scalars()
+
+    # A plain generator, so Starlette iterates it in the threadpool and the
+    # blocking yield_per fetches stay off the event loop
+    def stream_page():
+        yield b'{"items":['
+        count = 0
+        last_id = None
+        for analysis in analyses:
+            yield (b"," if count else b"") + orjson.dumps(_analysis_to_dict(analysis))
+            count += 1
+            last_id = analysis.id
+        # A short page means there is nothing left to fetch
+        next_cursor = last_id if count == limit else None
+        yield b'],"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+
+    return StreamingResponse(stream_page(), media_type="application/json")
+
+
+def _analysis_to_dict(analysis: Analysis) -> Dict:
+    """Pick the AnalysisResponse fields off an ORM row without validating them again."""
+    return {field: getattr(analysis, field) for field in AnalysisResponse.model_fields}
 
 
 @router.get("/analysis/{analysis_id}", response_model=AnalysisResponse)
 async def get_analysis(
         analysis_id: int,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db_ro)
 ):
     """Get a specific analysis by ID."""
     analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
-    return AnalysisResponse.model_validate(analysis)
+    return analysis
@@ -1,4 +1,7 @@
-from .connection import get_db, engine, SessionLocal
-from .models import Analysis, Base
+from .connection import get_db, get_db_ro, engine, SessionLocal, SessionLocalRO, init_search_index, \
+    search_index_enabled
+from .migrations import init_db
+from .models import Analysis, LLMCacheEntry, Base, lowercase_search_values
 
-__all__ = ['get_db', 'engine', 'SessionLocal', 'Analysis', 'Base']
+__all__ = ['get_db', 'get_db_ro', 'engine', 'SessionLocal', 'SessionLocalRO', 'init_db', 'init_search_index',
+           'search_index_enabled', 'Analysis', 'LLMCacheEntry', 'Base', 'lowercase_search_values']
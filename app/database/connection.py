@@ -1,19 +1,129 @@
 import os
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import Pool, QueuePool
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
 # Database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./data/knowledge_extractor.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    # timeout is SQLite's busy timeout: wait for the writer lock instead of failing with "database is locked"
+    connect_args={"check_same_thread": False, "timeout": 30},
+    # One connection per concurrent session; a single shared connection would mix their transactions
+    poolclass=QueuePool
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions for GET endpoints; their connections are switched to query_only (see _set_query_only)
+SessionLocalRO = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL and fsyncs less."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    cursor.close()
+
+
+@event.listens_for(SessionLocalRO, "after_begin")
+def _set_query_only(session, transaction, connection):
+    """Make read-only sessions refuse writes and skip write-lock bookkeeping."""
+    connection.exec_driver_sql("PRAGMA query_only=1")
+    connection.info["query_only"] = True
+
+
+# Registered on every pool, since SessionLocalRO may be bound to engines other than the default one
+@event.listens_for(Pool, "checkin")
+def _reset_query_only(dbapi_connection, connection_record):
+    """Pooled connections are shared with read-write sessions, so undo query_only on return."""
+    # An invalidated connection comes back without a DBAPI connection; its replacement starts fresh
+    if connection_record.info.pop("query_only", False) and dbapi_connection is not None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=0")
+        cursor.close()
+
+# Engines whose analyses_fts index has been set up by init_search_index
+_fts_engines = set()
+
+# Indexed values for a row; JSON arrays are flattened into space-joined text
+_FTS_VALUES = """{row}.id, {row}.title, {row}.summary,
+        (SELECT group_concat(value, ' ') FROM json_each({row}.topics)),
+        (SELECT group_concat(value, ' ') FROM json_each({row}.keywords))"""
+
+_FTS_INSERT = """INSERT INTO analyses_fts(rowid, title, summary, topics_text, keywords_text)
+    VALUES (""" + _FTS_VALUES + """);"""
+
+# Contentless tables need the original values to remove a row from the index
+_FTS_DELETE = """INSERT INTO analyses_fts(analyses_fts, rowid, title, summary, topics_text, keywords_text)
+    VALUES ('delete', """ + _FTS_VALUES + """);"""
+
+_FTS_BACKFILL = """INSERT INTO analyses_fts(rowid, title, summary, topics_text, keywords_text)
+    SELECT """ + _FTS_VALUES.format(row="analyses") + """ FROM analyses"""
+
+_FTS_DDL = [
+    # Trigram tokenizer gives case-insensitive substring matching
+    """CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5(
+        title, summary, topics_text, keywords_text, content='', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_ai AFTER INSERT ON analyses BEGIN
+    {_FTS_INSERT.format(row="new")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_ad AFTER DELETE ON analyses BEGIN
+    {_FTS_DELETE.format(row="old")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS analyses_fts_au AFTER UPDATE OF title, summary, topics, keywords ON analyses BEGIN
+    {_FTS_DELETE.format(row="old")}
+    {_FTS_INSERT.format(row="new")}
+END""",
+]
+
+
+def fts5_supported(conn) -> bool:
+    """Check whether SQLite was compiled with FTS5 and is new enough for the trigram tokenizer."""
+    options = {row[0] for row in conn.exec_driver_sql("PRAGMA compile_options")}
+    version = conn.exec_driver_sql("SELECT sqlite_version()").scalar()
+    return "ENABLE_FTS5" in options and tuple(int(p) for p in version.split(".")) >= (3, 34, 0)
+
+
+def init_search_index(conn) -> bool:
+    """
+    Create the analyses_fts full-text index and the triggers keeping it in sync.
+
+    Runs inside the caller's transaction on conn (see init_db), after the analyses
+    table exists. Rows stored before the index was created are backfilled. Returns
+    False if FTS5 is unavailable, in which case search falls back to scanning the
+    analyses table.
+    """
+    if not fts5_supported(conn):
+        return False
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'analyses_fts'")
+    ).first()
+    for statement in _FTS_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(text(_FTS_BACKFILL))
+
+    _fts_engines.add(conn.engine)
+    return True
+
+
+def search_index_enabled(bind) -> bool:
+    # Sessions bound to a Connection (e.g. an outer test transaction) report the Connection
+    return bind.engine in _fts_engines
+
+
 # Dependency for getting database session
 def get_db():
     db = SessionLocal()
@@ -21,3 +131,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency for getting a read-only database session
+def get_db_ro():
+    db = SessionLocalRO()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,74 @@
+import logging
+
+from sqlalchemy import inspect, select, update
+
+from .connection import Base, engine, init_search_index
+from .models import Analysis, lowercase_search_values
+
+logger = logging.getLogger(__name__)
+
+# Columns added to analyses after its first release, with their SQLite types
+_ADDED_COLUMNS = {
+    "summary_lc": "TEXT",
+    "title_lc": "VARCHAR(255)",
+    "topics_lc": "TEXT",
+    "keywords_lc": "TEXT"
+}
+
+
+def add_lowercase_columns(conn) -> None:
+    """Add the *_lc search columns to an existing analyses table and backfill them."""
+    existing = {column["name"] for column in inspect(conn).get_columns("analyses")}
+    missing = [name for name in _ADDED_COLUMNS if name not in existing]
+    if not missing:
+        return
+
+    logger.info(f"Adding columns to analyses: {', '.join(missing)}")
+    for name in missing:
+        conn.exec_driver_sql(f"ALTER TABLE analyses ADD COLUMN {name} {_ADDED_COLUMNS[name]}")
+
+    rows = conn.execute(
+        select(Analysis.id, Analysis.summary, Analysis.title, Analysis.topics, Analysis.keywords)
+    ).all()
+    for row in rows:
+        conn.execute(
+            update(Analysis.__table__)
+            .where(Analysis.id == row.id)
+            .values(**lowercase_search_values(row.summary, row.title, row.topics, row.keywords))
+        )
+
+
+def create_missing_indexes(conn) -> None:
+    """Create model indexes added after their table already existed; create_all skips existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _begin_immediate(conn) -> None:
+    """Start a transaction on conn that holds SQLite's write lock from the outset."""
+    conn.begin()
+    # pysqlite defers BEGIN until the first DML statement, so take the lock explicitly.
+    # Engines that emit their own BEGIN (such as the test engine) are already in a transaction.
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def init_db(bind=engine) -> bool:
+    """
+    Create or upgrade the schema and set up the full-text search index.
+
+    Every uvicorn worker calls this at startup. All checks and changes run in one
+    transaction holding the write lock, so concurrent workers apply them one at a
+    time and later ones find the schema already up to date.
+
+    Returns False if FTS5 is unavailable and search falls back to LIKE filtering.
+    """
+    with bind.connect() as conn:
+        _begin_immediate(conn)
+        Base.metadata.create_all(bind=conn)
+        add_lowercase_columns(conn)
+        create_missing_indexes(conn)
+        search_enabled = init_search_index(conn)
+        conn.commit()
+    return search_enabled
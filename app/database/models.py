@@ -1,10 +1,16 @@
 from datetime import datetime, timezone
+from typing import List, Optional
 
 from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
 
 from .connection import Base
 
 
+def _utcnow() -> datetime:
+    """Current UTC time as a naive datetime, the form SQLite stores and reads back."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Analysis(Base):
     __tablename__ = "analyses"
 
@@ -16,4 +22,28 @@ class Analysis(Base):
     sentiment = Column(String(20), nullable=False)  # positive/neutral/negative
     keywords = Column(JSON, nullable=False)  # List of 3 keywords
     confidence_score = Column(Integer, nullable=True)  # 0-100
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=_utcnow)
+
+    # Lowercased copies of the searchable fields, written once at insert time
+    summary_lc = Column(Text, nullable=True)
+    title_lc = Column(String(255), nullable=True)
+    topics_lc = Column(Text, nullable=True)  # Space-joined topics
+    keywords_lc = Column(Text, nullable=True)  # Space-joined keywords
+
+
+def lowercase_search_values(summary: str, title: Optional[str], topics: List[str], keywords: List[str]) -> dict:
+    """Build the *_lc column values for an analysis."""
+    return {
+        "summary_lc": summary.lower(),
+        "title_lc": title.lower() if title else None,
+        "topics_lc": " ".join(topics).lower(),
+        "keywords_lc": " ".join(keywords).lower()
+    }
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of model + prompt text
+    value = Column(JSON, nullable=False)  # Validated LLM result
+    created_at = Column(Integer, nullable=False, index=True)  # Unix timestamp; indexed for expiry pruning
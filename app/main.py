@@ -1,5 +1,9 @@
+import asyncio
 import logging
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
@@ -8,7 +12,8 @@ from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
 from .api import router
-from .database import engine, Base
+from .database import engine, init_db
+from .services import LLMService, get_text_processor
 
 # Load environment variables
 load_dotenv()
@@ -17,14 +22,49 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the database and create the shared services before the first request."""
+    # Create or upgrade database tables and the full-text search index
+    if not init_db(engine):
+        logger.warning("SQLite FTS5 not available; search will fall back to LIKE filtering")
+
+    app.state.llm_service_error = None
+    try:
+        app.state.llm_service = LLMService()
+    except ValueError as e:
+        # Keep serving the read endpoints; analysis requests report the error
+        logger.error(str(e))
+        app.state.llm_service = None
+        app.state.llm_service_error = str(e)
+    # Build the shared text processor up front rather than on the first request
+    text_processor = get_text_processor()
+    app.state.cpu_pool = None
+    if text_processor.use_pos_tagging:
+        # NLTK tagging holds the GIL for milliseconds per text, so it gets a process pool.
+        # Forking from a process already running the event loop and worker threads can
+        # deadlock, so workers are spawned fresh instead.
+        workers = os.cpu_count()
+        app.state.cpu_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # Start every worker now so no request pays for spawning one and re-importing the app
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(app.state.cpu_pool, get_text_processor) for _ in range(workers)))
+
+    yield
+
+    if app.state.cpu_pool is not None:
+        app.state.cpu_pool.shutdown()
+    if app.state.llm_service is not None:
+        await app.state.llm_service.client.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="LLM Knowledge Extractor",
     description="Extract summaries and structured metadata from text using LLMs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -59,8 +99,9 @@ def api_info():
         "message": "Welcome to LLM Knowledge Extractor API",
         "endpoints": {
             "POST /analyze": "Process new text and return analysis",
+            "POST /analyze/batch": "Process a list of texts concurrently and return their analyses",
             "GET /search?topic={topic}": "Search analyses by topic or keyword",
-            "GET /analyses": "Get all analyses with pagination",
+            "GET /analyses?cursor={next_cursor}": "Get analyses newest first, paginated by cursor",
             "GET /analysis/{id}": "Get specific analysis by ID"
         },
         "web_ui": "Visit / for the web interface"
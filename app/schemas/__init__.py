@@ -1,3 +1,3 @@
-from .models import AnalyzeRequest, AnalysisResponse, SearchResponse, ErrorResponse
+from .models import AnalyzeRequest, AnalysisResponse, AnalysisPage, SearchResponse, ErrorResponse
 
-__all__ = ['AnalyzeRequest', 'AnalysisResponse', 'SearchResponse', 'ErrorResponse']
+__all__ = ['AnalyzeRequest', 'AnalysisResponse', 'AnalysisPage', 'SearchResponse', 'ErrorResponse']
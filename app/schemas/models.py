@@ -28,6 +28,11 @@ class AnalysisResponse(BaseModel):
     created_at: datetime
 
 
+class AnalysisPage(BaseModel):
+    items: List[AnalysisResponse]
+    next_cursor: Optional[int]  # Pass as cursor to fetch the next page; None on the last page
+
+
 class SearchResponse(BaseModel):
     analyses: List[AnalysisResponse]
     total_count: int
@@ -1,4 +1,4 @@
 from .llm_service import LLMService
-from .text_processor import TextProcessor
+from .text_processor import TextProcessor, get_text_processor
 
-__all__ = ['LLMService', 'TextProcessor']
+__all__ = ['LLMService', 'TextProcessor', 'get_text_processor']
@@ -1,28 +1,74 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
-from typing import Dict
+import time
+from typing import Dict, Optional
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from sqlalchemy.exc import SQLAlchemyError
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+from ..database import SessionLocal, LLMCacheEntry
 
 # Load environment variables from .env file
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MODEL = "gpt-4.1-nano-2025-04-14"
+MAX_TEXT_LENGTH = 2000  # Limit text length to avoid token limits
+
+# Transient OpenAI errors worth retrying (429s, dropped connections, timeouts, 5xx)
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+MAX_ATTEMPTS = 5
+
+# Structured output schema; the model is constrained to emit JSON matching it
+ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "summary": {"type": "string"},
+                "title": {"type": ["string", "null"]},
+                "topics": {"type": "array", "items": {"type": "string"}},
+                "sentiment": {"type": "string", "enum": ["positive", "neutral", "negative"]}
+            },
+            "required": ["summary", "title", "topics", "sentiment"],
+            "additionalProperties": False
+        }
+    }
+}
+
 
 class LLMService:
-    def __init__(self):
+    def __init__(self, session_factory=SessionLocal):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError(
                 "OPENAI_API_KEY environment variable not set. "
                 "Please create a .env file in the project root with OPENAI_API_KEY=your-key-here"
             )
-        self.client = OpenAI(api_key=self.api_key)
-
-    def analyze_text(self, text: str) -> Dict:
+        # Keep-alive HTTP/2 connections are reused across requests, avoiding a TLS handshake per call
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=0,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        http_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(30, connect=5))
+        # Retries are handled in analyze_text, so disable the client's own
+        self.client = AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+        self.session_factory = session_factory
+        # Cached results older than this are ignored; 0 disables caching
+        self.cache_ttl = int(os.getenv("LLM_CACHE_TTL_SEC", "86400"))
+
+    async def analyze_text(self, text: str) -> Dict:
         """
         Analyze text using OpenAI API to extract summary and metadata.
         
@@ -35,62 +81,54 @@ class LLMService:
         Raises:
             Exception: If LLM API fails
         """
+        text = text[:MAX_TEXT_LENGTH]
+        cache_key = self._cache_key(text)
+        # The cache lives in SQLite; keep its blocking I/O off the event loop
+        cached = await asyncio.to_thread(self._get_cached, cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            # Create the prompt for structured output
+            # Create the prompt; the output format is enforced by ANALYSIS_RESPONSE_FORMAT
             prompt = f"""Analyze the following text and provide:
 1. A 1-2 sentence summary
 2. A title (if one can be inferred, otherwise null)
 3. Exactly 3 key topics
 4. The overall sentiment (positive, neutral, or negative)
 
-Return the result as valid JSON in this exact format:
-{{
-    "summary": "Your 1-2 sentence summary here",
-    "title": "Title here or null",
-    "topics": ["topic1", "topic2", "topic3"],
-    "sentiment": "positive/neutral/negative"
-}}
-
 Text to analyze:
-{text[:2000]}  # Limit text length to avoid token limits
+{text}
 """
 
-            response = self.client.chat.completions.create(
-                model="gpt-4.1-nano-2025-04-14",
-                messages=[
-                    {"role": "system",
-                     "content": "You are a helpful assistant that analyzes text and returns structured JSON data."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300
-            )
+            async for attempt in AsyncRetrying(
+                    stop=stop_after_attempt(MAX_ATTEMPTS),
+                    wait=wait_exponential_jitter(initial=1, max=16),
+                    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+                    reraise=True
+            ):
+                with attempt:
+                    response = await self.client.chat.completions.create(
+                        model=MODEL,
+                        messages=[
+                            {"role": "system",
+                             "content": "You are a helpful assistant that analyzes text and returns structured JSON data."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        response_format=ANALYSIS_RESPONSE_FORMAT,
+                        temperature=0.3,
+                        max_tokens=300
+                    )
 
             # Parse the response
-            result_text = response.choices[0].message.content.strip()
-
-            # Try to extract JSON from the response
-            try:
-                # Find JSON in the response (in case there's extra text)
-                start_idx = result_text.find('{')
-                end_idx = result_text.rfind('}') + 1
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = result_text[start_idx:end_idx]
-                    result = json.loads(json_str)
-                else:
-                    raise ValueError("No JSON found in response")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Failed to parse LLM response as JSON: {result_text}")
-                # Provide fallback response
-                return {
-                    "summary": "Unable to generate summary due to parsing error.",
-                    "title": None,
-                    "topics": ["unknown", "error", "parsing"],
-                    "sentiment": "neutral"
-                }
+            message = response.choices[0].message
+            if message.refusal:
+                raise Exception(f"LLM refused to analyze the text: {message.refusal}")
+            result = json.loads(message.content)
 
             # Validate and clean the result
-            return self._validate_result(result)
+            validated = self._validate_result(result)
+            await asyncio.to_thread(self._set_cached, cache_key, validated)
+            return validated
 
         except Exception as e:
             # Check for specific OpenAI errors
@@ -108,6 +146,38 @@ Text to analyze:
                 logger.error(f"Unexpected error in LLM service: {error_message}")
                 raise Exception(f"LLM analysis failed: {error_message}")
 
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        return hashlib.sha256(f"{MODEL}|{text}".encode()).hexdigest()
+
+    def _get_cached(self, key: str) -> Optional[Dict]:
+        """Return the cached result for key if it is younger than the TTL."""
+        if self.cache_ttl <= 0:
+            return None
+        try:
+            with self.session_factory() as db:
+                entry = db.query(LLMCacheEntry).filter(
+                    LLMCacheEntry.key == key,
+                    LLMCacheEntry.created_at > int(time.time()) - self.cache_ttl
+                ).first()
+                return entry.value if entry else None
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            return None
+
+    def _set_cached(self, key: str, value: Dict) -> None:
+        """Store value under key, dropping entries that have outlived the TTL."""
+        if self.cache_ttl <= 0:
+            return
+        now = int(time.time())
+        try:
+            with self.session_factory() as db:
+                db.query(LLMCacheEntry).filter(LLMCacheEntry.created_at <= now - self.cache_ttl).delete()
+                db.merge(LLMCacheEntry(key=key, value=value, created_at=now))
+                db.commit()
+        except SQLAlchemyError as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
     def _validate_result(self, result: Dict) -> Dict:
         """
         Validate and clean the LLM result to ensure it matches expected format.
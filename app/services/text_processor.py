@@ -1,54 +1,73 @@
+import os
 import re
-import ssl
 from collections import Counter
-
-import nltk
-
-# Fix SSL certificate issue on macOS
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    try:
-        nltk.download('punkt_tab')
-    except:
-        print("Warning: Could not download punkt_tab. Please run download_nltk_data_ssl_fix.py")
-
-try:
-    nltk.data.find('taggers/averaged_perceptron_tagger_eng')
-except LookupError:
-    try:
-        nltk.download('averaged_perceptron_tagger_eng')
-    except:
-        print("Warning: Could not download averaged_perceptron_tagger_eng. Please run download_nltk_data_ssl_fix.py")
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    try:
-        nltk.download('stopwords')
-    except:
-        print("Warning: Could not download stopwords. Please run download_nltk_data_ssl_fix.py")
-
-from nltk.tokenize import word_tokenize
-from nltk.tag import pos_tag
-from nltk.corpus import stopwords
+from functools import lru_cache
+
+# Lowercase alphabetic words of at least 3 letters
+_WORD_RE = re.compile(r"\b[a-z]{3,}\b")
+
+# Lowercases ASCII text and turns anything but letters, digits and whitespace into spaces, in one pass
+_CLEAN_TABLE = str.maketrans({
+    chr(c): chr(c).lower() if chr(c).isalnum() or chr(c).isspace() else " " for c in range(128)
+})
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+
+# NLTK's English stopword list, inlined so keyword extraction needs no corpus download
+STOP_WORDS = frozenset({
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', "you're", "you've", "you'll", "you'd",
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', "she's", 'her', 'hers',
+    'herself', 'it', "it's", 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which',
+    'who', 'whom', 'this', 'that', "that'll", 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if',
+    'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into',
+    'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off',
+    'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how', 'all',
+    'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own',
+    'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', "don't", 'should', "should've",
+    'now', 'd', 'll', 'm', 'o', 're', 've', 'y', 'ain', 'aren', "aren't", 'couldn', "couldn't", 'didn', "didn't",
+    'doesn', "doesn't", 'hadn', "hadn't", 'hasn', "hasn't", 'haven', "haven't", 'isn', "isn't", 'ma', 'mightn',
+    "mightn't", 'mustn', "mustn't", 'needn', "needn't", 'shan', "shan't", 'shouldn', "shouldn't", 'wasn', "wasn't",
+    'weren', "weren't", 'won', "won't", 'wouldn', "wouldn't"
+})
+
+# Below this many tokens POS filtering adds little signal, so tagging is skipped
+POS_TAGGING_MIN_TOKENS = 30
 
 
 class TextProcessor:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+    # Class attribute, so pickling an instance for a process pool does not copy the set
+    stop_words = STOP_WORDS
+
+    def __init__(self, use_pos_tagging: bool = None):
+        # POS tagging restricts keywords to nouns but is much slower and needs extra NLTK data
+        if use_pos_tagging is None:
+            use_pos_tagging = os.getenv("KEYWORDS_POS_TAGGING", "false").lower() in ("1", "true", "yes")
+        self.use_pos_tagging = use_pos_tagging
 
     def extract_keywords(self, text: str, n: int = 3) -> list[str]:
+        """
+        Extract the n most frequent non-stopword words from the text.
+        
+        Args:
+            text: The input text
+            n: Number of keywords to extract (default: 3)
+        
+        Returns:
+            List of n most frequent words
+        """
+        if self.use_pos_tagging:
+            return self.extract_keywords_pos(text, n)
+
+        tokens = _WORD_RE.findall(text.lower())
+        word_freq = Counter(token for token in tokens if token not in self.stop_words)
+        return [word for word, count in word_freq.most_common(n)]
+
+    def extract_keywords_pos(self, text: str, n: int = 3) -> list[str]:
         """
         Extract the n most frequent nouns from the text.
+
+        Requires the NLTK punkt_tab and averaged_perceptron_tagger_eng data
+        (see scripts/download_nltk_data_ssl_fix.py).
         
         Args:
             text: The input text
@@ -57,11 +76,25 @@ class TextProcessor:
         Returns:
             List of n most frequent nouns
         """
+        # Imported here so NLTK is only loaded when POS tagging is enabled
+        from nltk.tag import pos_tag
+        from nltk.tokenize import word_tokenize
+
         # Clean and tokenize text
-        text = text.lower()
-        text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
+        if text.isascii():
+            text = text.translate(_CLEAN_TABLE)
+        else:
+            text = _NON_ALNUM_RE.sub(' ', text.lower())
         tokens = word_tokenize(text)
 
+        # Short inputs: plain frequency of non-stopwords, without the tagger
+        if len(tokens) < POS_TAGGING_MIN_TOKENS:
+            candidates = [token for token in tokens
+                          if token.isalpha()
+                          and token not in self.stop_words
+                          and len(token) > 2]
+            return [word for word, count in Counter(candidates).most_common(n)]
+
         # Get POS tags
         tagged = pos_tag(tokens)
 
@@ -107,8 +140,15 @@ class TextProcessor:
 
         # Adjust based on topic relevance (check if topics appear in text)
         text_lower = text.lower()
+        # Three substring searches take ~3µs; an Aho-Corasick automaton would cost more to build than it saves
         topics_found = sum(1 for topic in topics if topic.lower() in text_lower)
         score += topics_found * 5
 
         # Ensure score is within bounds
         return max(0, min(100, score))
+
+
+@lru_cache(maxsize=1)
+def get_text_processor() -> TextProcessor:
+    """Return the process-wide TextProcessor, creating it on first use."""
+    return TextProcessor()
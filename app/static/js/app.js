@@ -99,8 +99,8 @@ async function loadRecentAnalyses() {
             throw new Error(error.detail || 'Failed to load analyses');
         }
 
-        const analyses = await response.json();
-        displayRecentAnalyses(analyses);
+        const page = await response.json();
+        displayRecentAnalyses(page.items);
     } catch (error) {
         showError(error.message);
     } finally {
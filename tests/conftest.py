@@ -0,0 +1,164 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.main import app
+from app.api.routes import get_cpu_pool, get_llm_service
+from app.database import Analysis, get_db, get_db_ro, init_db, lowercase_search_values
+from app.services import LLMService, get_text_processor
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """In-memory SQLite; StaticPool keeps every session on the one connection that holds the database."""
+    test_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    # pysqlite's implicit transaction handling breaks SAVEPOINT, so let SQLAlchemy emit BEGIN itself
+    @event.listens_for(test_engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(test_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    init_db(test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db(engine, session_factory):
+    """
+    Session inside an outer transaction that is rolled back after the test.
+
+    Commits made by the routes only release a SAVEPOINT, so rows never leak into the next test.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = session_factory(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="session")
+def processor():
+    """The same cached TextProcessor the app hands to its routes."""
+    return get_text_processor()
+
+
+@pytest.fixture
+def api_overrides(db):
+    """Wire the app's dependencies to the test session and services."""
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_db_ro] = lambda: db
+    # Run text processing inline rather than in the lifespan's process pool
+    app.dependency_overrides[get_cpu_pool] = lambda: None
+    yield
+    for dependency in (get_db, get_db_ro, get_cpu_pool):
+        app.dependency_overrides.pop(dependency, None)
+
+
+@pytest.fixture(scope="session")
+def app_client(engine):
+    """TestClient whose startup and shutdown (the app lifespan) run once per session."""
+    with pytest.MonkeyPatch.context() as mp:
+        # Let the lifespan initialise the test database instead of the real one
+        mp.setattr("app.main.engine", engine)
+        with TestClient(app) as c:
+            yield c
+
+
+@pytest.fixture
+def client(app_client, api_overrides):
+    return app_client
+
+
+class FakeLLM:
+    """
+    Stand-in for LLMService returning canned results.
+
+    analyze_text returns (or raises, for an exception) the next item of `responses`
+    while any are queued, and `response` otherwise.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.responses = []
+        self.calls = 0
+
+    async def analyze_text(self, text):
+        self.calls += 1
+        result = self.responses.pop(0) if self.responses else self.response
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture(autouse=True)
+def fake_llm():
+    """Serve every test's LLM calls from a FakeLLM; tests adjust its responses as needed."""
+    fake = FakeLLM({
+        "summary": "Test summary",
+        "title": "Test",
+        "topics": ["test", "example", "demo"],
+        "sentiment": "neutral"
+    })
+    app.dependency_overrides[get_llm_service] = lambda: fake
+    yield fake
+    app.dependency_overrides.pop(get_llm_service, None)
+
+
+@pytest.fixture
+async def llm_service(monkeypatch, db, session_factory):
+    """LLMService with a stubbed OpenAI client, caching into the test's rolled-back transaction."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    service = LLMService(
+        session_factory=lambda: session_factory(bind=db.get_bind(), join_transaction_mode="create_savepoint")
+    )
+    await service.client.close()
+
+    message = MagicMock(refusal=None)
+    message.content = '{"summary": "Cached summary.", "title": null, ' \
+                      '"topics": ["a", "b", "c"], "sentiment": "neutral"}'
+    response = MagicMock()
+    response.choices = [MagicMock(message=message)]
+    service.client = MagicMock()
+    service.client.chat.completions.create = AsyncMock(return_value=response)
+    return service
+
+
+@pytest.fixture
+def seed_analysis(db):
+    """Insert an analysis row directly, skipping the /analyze round-trip."""
+    def _seed(**overrides):
+        values = {
+            "original_text": "Test text",
+            "summary": "Test summary",
+            "title": "Test",
+            "topics": ["test", "example", "demo"],
+            "sentiment": "neutral",
+            "keywords": ["test", "text", "sample"],
+            "confidence_score": 50
+        }
+        values.update(overrides)
+        analysis = Analysis(
+            **values,
+            **lowercase_search_values(values["summary"], values["title"], values["topics"], values["keywords"])
+        )
+        db.add(analysis)
+        db.commit()
+        return analysis
+
+    return _seed
@@ -1,62 +1,48 @@
-import os
-import sys
-from unittest.mock import patch, MagicMock
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import APIConnectionError, RateLimitError
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from tenacity import wait_none
 
 from app.main import app
-from app.database import get_db, Base
-from app.services import TextProcessor
-
-# Ensure data directory exists
-os.makedirs("data", exist_ok=True)
-
-# Create test database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./data/test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-
-app.dependency_overrides[get_db] = override_get_db
+from app.api.routes import _analyze_with_fallback, get_cpu_pool
+from app.database import LLMCacheEntry, SessionLocal, SessionLocalRO, init_db, search_index_enabled
+from app.services import llm_service as llm_service_module
+
+# Sample test data, whitespace-normalized once at import
+SAMPLE_TEXT = " ".join("""
+Artificial Intelligence is transforming the technology landscape.
+Machine learning algorithms are becoming increasingly sophisticated,
+enabling computers to perform tasks that were once thought to be
+exclusively human. The future of AI looks promising with applications
+in healthcare, finance, and education.
+""".split())
 
-client = TestClient(app)
 
-# Sample test data
-SAMPLE_TEXT = """
-Artificial Intelligence is transforming the technology landscape. 
-Machine learning algorithms are becoming increasingly sophisticated, 
-enabling computers to perform tasks that were once thought to be 
-exclusively human. The future of AI looks promising with applications 
-in healthcare, finance, and education.
-"""
+@pytest.fixture(scope="session")
+def sample_keywords(processor):
+    """Keywords extracted from SAMPLE_TEXT, computed once per session."""
+    return processor.extract_keywords(SAMPLE_TEXT)
 
 
 class TestAPI:
     """Test suite for the LLM Knowledge Extractor API."""
 
-    def test_root_endpoint(self):
+    def test_root_endpoint(self, client):
         """Test the root endpoint returns HTML for web UI."""
         response = client.get("/")
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
         assert "LLM Knowledge Extractor" in response.text
 
-    def test_api_endpoint(self):
+    def test_api_endpoint(self, client):
         """Test the /api endpoint returns API information."""
         response = client.get("/api")
         assert response.status_code == 200
@@ -64,7 +50,7 @@ class TestAPI:
         assert "message" in data
         assert "endpoints" in data
 
-    def test_analyze_empty_input(self):
+    def test_analyze_empty_input(self, client, fake_llm):
         """Test that empty input is properly rejected."""
         response = client.post("/analyze", json={"text": ""})
         assert response.status_code == 422
@@ -72,15 +58,11 @@ class TestAPI:
         response = client.post("/analyze", json={"text": "   "})
         assert response.status_code == 422
 
-    @patch('app.api.routes.get_llm_service')
-    def test_analyze_success(self, mock_get_llm_service):
+        assert fake_llm.calls == 0
+
+    def test_analyze_success(self, client, fake_llm):
         """Test successful text analysis."""
-        # Mock LLM service
-        mock_llm = MagicMock()
-        mock_get_llm_service.return_value = mock_llm
-        
-        # Mock LLM response
-        mock_llm.analyze_text.return_value = {
+        fake_llm.response = {
             "summary": "AI is transforming technology through machine learning.",
             "title": "AI and Machine Learning",
             "topics": ["artificial intelligence", "machine learning", "technology"],
@@ -98,13 +80,28 @@ class TestAPI:
         assert len(data["keywords"]) == 3
         assert data["confidence_score"] is not None
 
-    @patch('app.api.routes.get_llm_service')
-    def test_analyze_llm_failure(self, mock_get_llm_service):
+    def test_analyze_response_matches_stored_row(self, client):
+        """Test that POST /analyze returns the row exactly as GET /analysis/{id} reads it back."""
+        created = client.post("/analyze", json={"text": SAMPLE_TEXT}).json()
+
+        fetched = client.get(f"/analysis/{created['id']}").json()
+        assert created == fetched
+
+    def test_analyze_in_process_pool(self, client):
+        """Test that text processing works in a spawned process pool, as used with POS tagging."""
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            app.dependency_overrides[get_cpu_pool] = lambda: pool
+            response = client.post("/analyze", json={"text": SAMPLE_TEXT})
+        assert response.status_code == 200
+
+        data = response.json()
+        assert len(data["keywords"]) == 3
+        assert data["confidence_score"] is not None
+
+    def test_analyze_llm_failure(self, client, fake_llm):
         """Test graceful handling of LLM API failure."""
-        # Mock LLM service to raise exception
-        mock_llm = MagicMock()
-        mock_get_llm_service.return_value = mock_llm
-        mock_llm.analyze_text.side_effect = Exception("API Error")
+        # Make the LLM call fail
+        fake_llm.response = Exception("API Error")
 
         response = client.post("/analyze", json={"text": SAMPLE_TEXT})
         assert response.status_code == 200
@@ -114,25 +111,37 @@ class TestAPI:
         assert data["sentiment"] == "neutral"
         assert data["topics"] == ["error", "processing", "failed"]
 
-    @patch('app.api.routes.get_llm_service')
-    def test_search_functionality(self, mock_get_llm_service):
-        """Test search endpoint functionality."""
-        # Mock LLM service
-        mock_llm = MagicMock()
-        mock_get_llm_service.return_value = mock_llm
-        
-        # First, create an analysis
-        mock_llm.analyze_text.return_value = {
-            "summary": "Python is a versatile programming language.",
-            "title": "Python Programming",
-            "topics": ["python", "programming", "development"],
-            "sentiment": "positive"
-        }
-
-        # Analyze text
-        response = client.post("/analyze", json={"text": "Python programming is awesome"})
+    def test_analyze_batch(self, client, fake_llm):
+        """Test batch analysis with one LLM success and one LLM failure."""
+        fake_llm.responses = [
+            {
+                "summary": "AI is transforming technology through machine learning.",
+                "title": "AI and Machine Learning",
+                "topics": ["artificial intelligence", "machine learning", "technology"],
+                "sentiment": "positive"
+            },
+            Exception("API Error")
+        ]
+
+        response = client.post("/analyze/batch", json=[{"text": SAMPLE_TEXT}, {"text": "Another text"}])
         assert response.status_code == 200
 
+        data = response.json()
+        assert len(data) == 2
+        assert data[0]["sentiment"] == "positive"
+        assert data[1]["topics"] == ["error", "processing", "failed"]
+        assert data[0]["id"] != data[1]["id"]
+
+    def test_search_functionality(self, client, seed_analysis):
+        """Test search endpoint functionality."""
+        seed_analysis(
+            original_text="Python programming is awesome",
+            summary="Python is a versatile programming language.",
+            title="Python Programming",
+            topics=["python", "programming", "development"],
+            sentiment="positive"
+        )
+
         # Search for it
         response = client.get("/search?topic=python")
         assert response.status_code == 200
@@ -150,32 +159,63 @@ class TestAPI:
                 break
         assert found
 
-    def test_search_missing_parameter(self):
+    def test_search_short_term(self, client, seed_analysis):
+        """Test that terms too short for the trigram index fall back to LIKE matching."""
+        match = seed_analysis(title="AI in healthcare", topics=["ai", "medicine", "research"]).id
+        seed_analysis(title="Gardening tips", topics=["plants", "soil", "water"])
+
+        data = client.get("/search?topic=AI").json()
+        assert [a["id"] for a in data["analyses"]] == [match]
+
+    def test_search_wildcard_characters(self, client, seed_analysis):
+        """Test that % and _ in a search term match literally instead of as LIKE wildcards."""
+        percent = seed_analysis(summary="Coverage reached 100% this week.").id
+        underscore = seed_analysis(summary="Renamed the snake_case helpers.").id
+        seed_analysis(summary="Nothing special here.")
+
+        data = client.get("/search", params={"topic": "%"}).json()
+        assert [a["id"] for a in data["analyses"]] == [percent]
+
+        data = client.get("/search", params={"topic": "_"}).json()
+        assert [a["id"] for a in data["analyses"]] == [underscore]
+
+    def test_search_missing_parameter(self, client):
         """Test search endpoint with missing parameter."""
         response = client.get("/search")
         assert response.status_code == 422
 
-    def test_get_all_analyses(self):
+    def test_get_all_analyses(self, client):
         """Test retrieving all analyses."""
         response = client.get("/analyses")
         assert response.status_code == 200
         data = response.json()
-        assert isinstance(data, list)
+        assert isinstance(data["items"], list)
+        assert "next_cursor" in data
+
+    def test_get_analyses_pagination(self, client, seed_analysis):
+        """Test paging through analyses with the returned cursor."""
+        older_id = seed_analysis(original_text="Older text").id
+        newer_id = seed_analysis(original_text="Newer text").id
+
+        first_page = client.get("/analyses?limit=1").json()
+        assert [a["id"] for a in first_page["items"]] == [newer_id]
+        assert first_page["next_cursor"] == newer_id
+
+        second_page = client.get(f"/analyses?limit=1&cursor={first_page['next_cursor']}").json()
+        assert [a["id"] for a in second_page["items"]] == [older_id]
 
-    def test_get_analysis_by_id(self):
+    def test_analyses_items_match_single_analysis(self, client, seed_analysis):
+        """Test that /analyses streams each item as exactly the bytes /analysis/{id} returns."""
+        analysis_id = seed_analysis(summary="Café résumé — naïve “quotes”.", title=None).id
+
+        page = client.get("/analyses").content
+        single = client.get(f"/analysis/{analysis_id}").content
+
+        assert page == b'{"items":[' + single + b'],"next_cursor":null}'
+
+    def test_get_analysis_by_id(self, client, seed_analysis):
         """Test retrieving a specific analysis by ID."""
-        # First create an analysis
-        with patch('app.api.routes.get_llm_service') as mock_get_llm_service:
-            mock_llm = MagicMock()
-            mock_get_llm_service.return_value = mock_llm
-            mock_llm.analyze_text.return_value = {
-                "summary": "Test summary",
-                "title": "Test",
-                "topics": ["test", "example", "demo"],
-                "sentiment": "neutral"
-            }
-            response = client.post("/analyze", json={"text": "Test text"})
-            analysis_id = response.json()["id"]
+        analysis_id = seed_analysis().id
 
         # Get the analysis
         response = client.get(f"/analysis/{analysis_id}")
@@ -183,39 +223,262 @@ class TestAPI:
         data = response.json()
         assert data["id"] == analysis_id
 
-    def test_get_nonexistent_analysis(self):
+    def test_get_nonexistent_analysis(self, client):
         """Test retrieving a non-existent analysis."""
         response = client.get("/analysis/99999")
         assert response.status_code == 404
 
+    @pytest.mark.asyncio
+    async def test_readonly_endpoints_concurrent(self, api_overrides):
+        """Test that independent GET endpoints answer correctly when requested together."""
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            root, api, search, analyses, missing = await asyncio.gather(
+                ac.get("/"),
+                ac.get("/api"),
+                ac.get("/search"),
+                ac.get("/analyses"),
+                ac.get("/analysis/99999")
+            )
+
+        assert root.status_code == 200
+        assert "LLM Knowledge Extractor" in root.text
+        assert api.status_code == 200
+        assert "endpoints" in api.json()
+        assert search.status_code == 422
+        assert analyses.status_code == 200
+        assert analyses.json() == {"items": [], "next_cursor": None}
+        assert missing.status_code == 404
+
 
 class TestTextProcessor:
     """Test suite for text processing functionality."""
 
-    def test_keyword_extraction(self):
+    def test_keyword_extraction(self, sample_keywords):
         """Test keyword extraction from text."""
-        processor = TextProcessor()
-        keywords = processor.extract_keywords(SAMPLE_TEXT)
-
-        assert len(keywords) == 3
-        assert all(isinstance(k, str) for k in keywords)
-        # Should extract nouns like "intelligence", "technology", "learning"
+        assert len(sample_keywords) == 3
+        assert all(isinstance(k, str) for k in sample_keywords)
+        # Should extract words like "intelligence", "technology", "learning"
         assert any(k in ["intelligence", "technology", "learning", "algorithms",
                          "computers", "tasks", "future", "applications",
-                         "healthcare", "finance", "education"] for k in keywords)
+                         "healthcare", "finance", "education"] for k in sample_keywords)
 
-    def test_confidence_score_calculation(self):
+    def test_confidence_score_calculation(self, processor, sample_keywords):
         """Test confidence score calculation."""
-        processor = TextProcessor()
         score = processor.calculate_confidence_score(
             SAMPLE_TEXT,
             "AI is transforming technology",
-            ["intelligence", "technology", "learning"]
+            sample_keywords
         )
 
         assert 0 <= score <= 100
         assert isinstance(score, int)
 
 
+class TestDatabase:
+    """Test suite for schema setup and upgrades."""
+
+    @staticmethod
+    def _create_pre_upgrade_database(path):
+        """Write an analyses table with the original schema and one row, as released before the *_lc columns."""
+        old_engine = create_engine(f"sqlite:///{path}")
+        with old_engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE analyses (id INTEGER PRIMARY KEY, original_text TEXT NOT NULL, "
+                "summary TEXT NOT NULL, title VARCHAR(255), topics JSON NOT NULL, sentiment VARCHAR(20) NOT NULL, "
+                "keywords JSON NOT NULL, confidence_score INTEGER, created_at DATETIME)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO analyses (original_text, summary, title, topics, sentiment, keywords) VALUES "
+                "('Some text', 'Python Is Great', 'Python Tips', ?, 'positive', ?)",
+                ('["Python", "Coding", "Tips"]', '["Python", "Great", "Tips"]')
+            )
+        return old_engine
+
+    def test_init_db_upgrades_existing_database(self, tmp_path):
+        """Test that init_db adds and backfills the search columns on a database from before they existed."""
+        old_engine = self._create_pre_upgrade_database(tmp_path / "old.db")
+        try:
+            init_db(old_engine)
+
+            columns = {column["name"] for column in inspect(old_engine).get_columns("analyses")}
+            assert {"summary_lc", "title_lc", "topics_lc", "keywords_lc"} <= columns
+
+            with old_engine.connect() as conn:
+                row = conn.execute(
+                    text("SELECT summary_lc, title_lc, topics_lc, keywords_lc FROM analyses")
+                ).one()
+                assert tuple(row) == ("python is great", "python tips", "python coding tips", "python great tips")
+
+                # Rows stored before the upgrade are searchable through the new index too
+                if search_index_enabled(old_engine):
+                    matches = conn.execute(text("SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH 'coding'"))
+                    assert matches.scalars().all() == [1]
+        finally:
+            old_engine.dispose()
+
+    def test_init_db_indexes_existing_cache_table(self, tmp_path):
+        """Test that init_db adds the expiry index to an llm_cache table created before it existed."""
+        old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+        with old_engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE llm_cache (key VARCHAR(64) PRIMARY KEY, value JSON NOT NULL, created_at INTEGER NOT NULL)"
+            )
+        try:
+            init_db(old_engine)
+
+            indexes = {index["name"] for index in inspect(old_engine).get_indexes("llm_cache")}
+            assert "ix_llm_cache_created_at" in indexes
+        finally:
+            old_engine.dispose()
+
+    def test_init_db_concurrent_workers(self, tmp_path):
+        """Test that several workers upgrading the same database at startup do not trip over each other."""
+        self._create_pre_upgrade_database(tmp_path / "old.db").dispose()
+        engines = [create_engine(f"sqlite:///{tmp_path / 'old.db'}") for _ in range(4)]
+        barrier = threading.Barrier(len(engines))
+
+        def start_worker(worker_engine):
+            barrier.wait()
+            return init_db(worker_engine)
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(engines)) as executor:
+                results = list(executor.map(start_worker, engines))
+            assert len(set(results)) == 1
+
+            with engines[0].connect() as conn:
+                assert conn.execute(text("SELECT topics_lc FROM analyses")).scalar() == "python coding tips"
+                # The pre-upgrade row is indexed exactly once
+                if results[0]:
+                    matches = conn.execute(text("SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH 'coding'"))
+                    assert matches.scalars().all() == [1]
+        finally:
+            for worker_engine in engines:
+                worker_engine.dispose()
+
+    def test_read_only_session_rejects_writes(self, tmp_path):
+        """Test that read-only sessions refuse writes without leaving their connection read-only."""
+        # A single pooled connection, so the write session reuses the read-only session's connection
+        pool_engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0
+        )
+        insert_entry = text("INSERT INTO llm_cache (key, value, created_at) VALUES ('k', '{}', 0)")
+        try:
+            init_db(pool_engine)
+
+            with SessionLocalRO(bind=pool_engine) as db:
+                with pytest.raises(OperationalError, match="readonly"):
+                    db.execute(insert_entry)
+
+            with SessionLocal(bind=pool_engine) as db:
+                assert db.execute(text("PRAGMA query_only")).scalar() == 0
+                db.execute(insert_entry)
+                db.commit()
+        finally:
+            pool_engine.dispose()
+
+    def test_invalidated_read_only_connection_is_released(self, tmp_path):
+        """Test that closing a read-only session whose connection was invalidated does not fail."""
+        pool_engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0
+        )
+        try:
+            db = SessionLocalRO(bind=pool_engine)
+            db.execute(text("SELECT 1"))
+            db.connection().invalidate()
+            db.close()
+
+            with SessionLocal(bind=pool_engine) as db:
+                assert db.execute(text("PRAGMA query_only")).scalar() == 0
+        finally:
+            pool_engine.dispose()
+
+
+def _openai_request() -> httpx.Request:
+    return httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def _rate_limit_error() -> RateLimitError:
+    return RateLimitError(
+        "Rate limit reached for requests", response=httpx.Response(429, request=_openai_request()), body=None
+    )
+
+
+@pytest.fixture
+def no_retry_wait(monkeypatch):
+    """Retry transient LLM errors immediately instead of backing off."""
+    monkeypatch.setattr(llm_service_module, "wait_exponential_jitter", lambda **kwargs: wait_none())
+
+
+class TestLLMService:
+    """Test suite for the LLM service."""
+
+    @pytest.mark.parametrize("error", [_rate_limit_error, lambda: APIConnectionError(request=_openai_request())])
+    async def test_transient_error_is_retried(self, llm_service, no_retry_wait, error):
+        """Test that a rate limit or connection error is retried and the next attempt's result returned."""
+        create = llm_service.client.chat.completions.create
+        create.side_effect = [error(), create.return_value]
+
+        result = await llm_service.analyze_text("Retry me")
+
+        assert result["summary"] == "Cached summary."
+        assert create.await_count == 2
+
+    async def test_persistent_rate_limit_is_reported(self, llm_service, no_retry_wait):
+        """Test that a rate limit outlasting every attempt surfaces as the rate limit error."""
+        create = llm_service.client.chat.completions.create
+        create.side_effect = _rate_limit_error()
+
+        with pytest.raises(Exception, match="LLM API rate limit exceeded"):
+            await llm_service.analyze_text("Retry me")
+
+        assert create.await_count == llm_service_module.MAX_ATTEMPTS
+
+    async def test_identical_text_is_served_from_cache(self, llm_service):
+        """Test that repeated analysis of the same text only calls the LLM once."""
+        first = await llm_service.analyze_text("Cache me")
+        second = await llm_service.analyze_text("Cache me")
+
+        assert first == second
+        assert first["summary"] == "Cached summary."
+        assert llm_service.client.chat.completions.create.await_count == 1
+
+    async def test_expired_cache_entries_are_pruned(self, llm_service, db):
+        """Test that storing a new result removes entries older than the TTL."""
+        db.add(LLMCacheEntry(key="stale", value={}, created_at=0))
+        db.commit()
+
+        await llm_service.analyze_text("Fresh text")
+
+        assert db.query(LLMCacheEntry).filter(LLMCacheEntry.key == "stale").count() == 0
+        assert db.query(LLMCacheEntry).count() == 1
+
+
+    async def test_refusal_falls_back(self, llm_service, db):
+        """Test that a model refusal is raised and turned into the fallback analysis."""
+        message = llm_service.client.chat.completions.create.return_value.choices[0].message
+        message.refusal = "I can't help with that."
+
+        with pytest.raises(Exception, match="refused"):
+            await llm_service.analyze_text("Refuse me")
+
+        result = await _analyze_with_fallback(llm_service, "Refuse me")
+        assert result["topics"] == ["error", "processing", "failed"]
+        assert db.query(LLMCacheEntry).count() == 0
+
+    async def test_truncated_content_falls_back(self, llm_service, db):
+        """Test that JSON cut off mid-response is raised and turned into the fallback analysis."""
+        message = llm_service.client.chat.completions.create.return_value.choices[0].message
+        message.content = '{"summary": "Cut off mid'
+
+        with pytest.raises(Exception, match="LLM analysis failed"):
+            await llm_service.analyze_text("Truncate me")
+
+        result = await _analyze_with_fallback(llm_service, "Truncate me")
+        assert result["topics"] == ["error", "processing", "failed"]
+        assert db.query(LLMCacheEntry).count() == 0
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])